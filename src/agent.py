@@ -11,23 +11,63 @@ Features:
 - Planning + Execution agents
 """
 
-import os
+import re
 import sys
-import json
 import time
-import psutil
+import math
+import array
+import operator
+import platform
+import sqlite3
+import hashlib
+import requests
+import threading
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional, List
-from dataclasses import dataclass, asdict
+from typing import Dict, Any, Optional, List, Tuple
+from dataclasses import dataclass, field, asdict
 from datetime import datetime
 
+from ollama_service import (
+    HTTP, OLLAMA_TIMEOUT, OllamaService, json_dumps, json_loads, total_ram_gb
+)
+
 # Configuration
 APP_NAME = "SuperPalmTree"
 APP_VERSION = "1.0.0"
 SANDBOX_DIR = Path.home() / "superpalmtree-exp"
 CONFIG_DIR = Path.home() / ".superpalmtree"
 OLLAMA_PORT = 11434
+MODEL_KEEP_ALIVE = "30m"  # Keep the model resident between planner/executor calls
+OLLAMA_NUM_PARALLEL = 4  # Concurrent requests the Ollama server will batch together
+CACHE_DB = CONFIG_DIR / "cache.db"
+SEMANTIC_CACHE_THRESHOLD = 0.95  # Cosine similarity needed to reuse a cached response
+CACHE_MAX_ROWS = 256  # Oldest entries are trimmed past this; bounds the semantic scan
+EMBED_MODEL = "nomic-embed-text"  # Small embedding model; semantic tier is off unless it's installed
+MAX_NUM_THREAD = 16  # Inference stops scaling past this many cores
+NUM_BATCH = 2048  # Prompt tokens processed per batch during prefill
+MIN_CONTEXT_SIZE = 4096  # Smallest per-request num_ctx (leaves room for the reply)
+
+# Literal tokens a similar-looking prompt must repeat exactly before its cached
+# plan is reused: URLs, paths, file names, quoted strings and numbers
+PROMPT_LITERAL = re.compile(
+    r"""\w+://\S+|(?:~|\.{1,2})?/[^\s'"]+|[\w-]+\.[A-Za-z0-9]+\b|"[^"]*"|'[^']*'|\d+(?:\.\d+)?"""
+)
+
+# Step params that mention an earlier step's output ("{{step 2}}", "step_1", "previous result")
+STEP_REFERENCE = re.compile(r"\{\{\s*step|\bstep[ _-]?\d+\b|\bprevious\b", re.IGNORECASE)
+
+# Model tiers, largest first: (model, min RAM GB, context size, weights GB).
+# Weight sizes are the Ollama library's default qwen3 tags, which are already
+# Q4_K_M, so a tier that crowds the GPU can only step down to a smaller one
+MODEL_TIERS = [
+    ("qwen3:8b", 16, 32768, 5.2),
+    ("qwen3:4b", 8, 16384, 2.5),
+    ("qwen3:1.7b", 4, 8192, 1.4),
+    ("qwen3:0.6b", 0, 4096, 0.5),
+]
+VRAM_HEADROOM = 1.2  # Free VRAM needed per GB of weights (KV cache and buffers)
 
 # System Prompt for Planning Agent
 PLANNER_SYSTEM_PROMPT = """You are SuperPalmTree Planner - an expert AI task planner.
@@ -90,18 +130,93 @@ RESPONSE FORMAT:
 - Next: What should happen next"""
 
 
+# Wall-clock minus monotonic time, for turning monotonic_ns stamps into dates
+MONOTONIC_EPOCH_NS = time.time_ns() - time.monotonic_ns()
+
+
+def _monotonic_ns_to_iso(ns: Optional[int]) -> Optional[str]:
+    """Format a time.monotonic_ns() stamp as a local ISO timestamp"""
+    if ns is None:
+        return None
+    return datetime.fromtimestamp((ns + MONOTONIC_EPOCH_NS) / 1e9).isoformat()
+
+
+# Step status codes stored in TaskPlanColumns.status_code, and their names
+STEP_PENDING, STEP_RUNNING, STEP_OK, STEP_FAILED = range(4)
+STEP_STATUS_NAMES = ("pending", "running", "completed", "failed")
+
+
 @dataclass
 class TaskStep:
-    """Represents a single task step"""
+    """
+    Represents a single task step.
+    
+    Execution state (status, monotonic_ns timings) is not stored here: the
+    properties below read this step's row in the owning plan's columns.
+    """
     step_num: int
     tool: str
     params: Dict[str, Any]
     purpose: str
     estimated_seconds: int
-    status: str = "pending"
     result: Optional[str] = None
-    started_at: Optional[str] = None
-    completed_at: Optional[str] = None
+    index: int = field(default=-1, repr=False)  # Row in the plan's TaskPlanColumns
+    columns: Optional["TaskPlanColumns"] = field(default=None, init=False, repr=False, compare=False)
+    
+    @property
+    def status(self) -> str:
+        if self.columns is None:
+            return STEP_STATUS_NAMES[STEP_PENDING]
+        return STEP_STATUS_NAMES[self.columns.status_code[self.index]]
+    
+    @property
+    def started_at(self) -> Optional[int]:
+        """time.monotonic_ns() when the step started, or None"""
+        return (self.columns.started_ns[self.index] or None) if self.columns else None
+    
+    @property
+    def completed_at(self) -> Optional[int]:
+        """time.monotonic_ns() when the step finished, or None"""
+        return (self.columns.completed_ns[self.index] or None) if self.columns else None
+    
+    @property
+    def started_iso(self) -> Optional[str]:
+        return _monotonic_ns_to_iso(self.started_at)
+    
+    @property
+    def completed_iso(self) -> Optional[str]:
+        return _monotonic_ns_to_iso(self.completed_at)
+
+
+class TaskPlanColumns:
+    """
+    Per-step execution state of a plan stored column-wise.
+    
+    One typed array per field, preallocated to the number of steps, so
+    aggregates are single C-level calls and logging is one copy per column.
+    """
+    
+    def __init__(self, steps: List[TaskStep]):
+        n = len(steps)
+        self.step_num = array.array("i", (step.step_num for step in steps))
+        self.tool = [step.tool for step in steps]
+        self.status_code = array.array("B", bytes(n))
+        self.started_ns = array.array("q", bytes(8 * n))
+        self.completed_ns = array.array("q", bytes(8 * n))
+    
+    def count(self, status_code: int) -> int:
+        """Number of steps with the given status code"""
+        return self.status_code.count(status_code)
+    
+    def to_dict(self) -> Dict[str, list]:
+        """Serialize all columns as plain lists"""
+        return {
+            "step_num": self.step_num.tolist(),
+            "tool": list(self.tool),
+            "status_code": self.status_code.tolist(),
+            "started_ns": self.started_ns.tolist(),
+            "completed_ns": self.completed_ns.tolist(),
+        }
 
 
 @dataclass
@@ -112,103 +227,425 @@ class TaskPlan:
     steps: List[TaskStep]
     fallback_plan: str
     created_at: str = None
+    columns: TaskPlanColumns = field(init=False, repr=False)
     
     def __post_init__(self):
         if self.created_at is None:
             self.created_at = datetime.now().isoformat()
+        self.columns = TaskPlanColumns(self.steps)
+        for i, step in enumerate(self.steps):
+            step.index = i
+            step.columns = self.columns
+
+
+class _JsonObjectTracker:
+    """Incrementally tracks brace depth to spot the first complete JSON object"""
+    
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, text: str) -> int:
+        """Consume a chunk of text; return the index closing the first {...}, or -1"""
+        for i, c in enumerate(text):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif c == "\\":
+                    self.escaped = True
+                elif c == '"':
+                    self.in_string = False
+            elif c == '"':
+                self.in_string = self.started
+            elif c == "{":
+                self.depth += 1
+                self.started = True
+            elif c == "}" and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return i
+        return -1
+
+
+class _JsonStreamStop:
+    """Watches streamed response chunks for the end of the answer's first JSON object"""
+    
+    def __init__(self):
+        self.head = ""  # Text before the JSON body has been located
+        self.tracker = _JsonObjectTracker()
+    
+    def feed(self, text: str) -> bool:
+        """Consume a chunk; True once the first complete object has arrived"""
+        if self.head is not None:
+            # Don't track braces until the answer's JSON has begun
+            self.head += text
+            start = _json_body_start(self.head)
+            if start < 0:
+                return False
+            text, self.head = self.head[start:], None
+        return self.tracker.feed(text) >= 0
+
+
+def _next_pow2(n: int) -> int:
+    """Smallest power of two >= n"""
+    return 1 << max(n - 1, 0).bit_length()
+
+
+def _json_body_start(text: str) -> int:
+    """
+    Index where the answer's JSON may begin in a (partial) model response,
+    or -1 while that isn't known yet.
+    
+    Braces inside a <think> block or in prose before a ```json fence are not
+    the answer, so the body starts after an open fence, or at a bare "{"
+    that opens the reply (after any closed <think> block).
+    """
+    think_end = text.find("</think>")
+    if think_end < 0:
+        if "<think>" in text:
+            return -1
+        reply = 0
+    else:
+        reply = think_end + len("</think>")
+    
+    fence = text.find("```json", reply)
+    if fence >= 0:
+        return fence + len("```json")
+    stripped = text[reply:].lstrip()
+    if stripped.startswith("{"):
+        return len(text) - len(stripped)
+    return -1
+
+
+def _extract_json(text: str) -> str:
+    """Slice the first balanced JSON object out of a model response in one pass"""
+    start = _json_body_start(text)
+    if start < 0:
+        # No fence or leading brace: fall back to the first "{" after any <think>
+        think_end = text.find("</think>")
+        start = think_end + len("</think>") if think_end >= 0 else 0
+    start = text.find("{", start)
+    if start < 0:
+        return text
+    end = _JsonObjectTracker().feed(text[start:])
+    return text[start:] if end < 0 else text[start:start + end + 1]
+
+
+class ResponseCache:
+    """
+    Two-tier cache of model responses.
+    
+    Exact tier: blake2b of (model, system, prompt) as the primary key.
+    Semantic tier: unit-normalized prompt embeddings stored as float32 blobs;
+    a cached response is reused when cosine similarity clears the threshold
+    and both prompts carry the same literal tokens (see PROMPT_LITERAL).
+    At most max_rows entries are kept, oldest trimmed first.
+    """
+    
+    def __init__(self, path: Path, max_rows: int = CACHE_MAX_ROWS):
+        self._max_rows = max_rows
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS cache (
+                hash TEXT PRIMARY KEY,
+                scope TEXT,
+                prompt TEXT,
+                emb BLOB,
+                response TEXT
+            )"""
+        )
+        self._db.commit()
+    
+    @staticmethod
+    def _digest(*parts: str) -> str:
+        return hashlib.blake2b("\0".join(parts).encode(), digest_size=16).hexdigest()
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> array.array:
+        norm = math.sqrt(sum(x * x for x in embedding)) or 1.0
+        return array.array("f", (x / norm for x in embedding))
+    
+    def get(self, model: str, system: str, prompt: str) -> Optional[str]:
+        """Exact-match lookup"""
+        key = self._digest(model, system, prompt)
+        with self._lock:
+            row = self._db.execute("SELECT response FROM cache WHERE hash=?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def get_similar(self, model: str, system: str, prompt: str,
+                    embedding: List[float]) -> Optional[str]:
+        """Return the closest cached response within the same model/system scope"""
+        query = self._normalize(embedding)
+        literals = PROMPT_LITERAL.findall(prompt)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT prompt, emb, response FROM cache WHERE scope=? AND emb IS NOT NULL",
+                (self._digest(model, system),)
+            ).fetchall()
+        
+        best_score, best_response = SEMANTIC_CACHE_THRESHOLD, None
+        for cached_prompt, blob, response in rows:
+            cached = array.array("f")
+            cached.frombytes(blob)
+            if len(cached) != len(query):
+                continue
+            score = sum(map(operator.mul, query, cached))
+            # Close wording isn't enough: a plan for a.txt must not run on b.txt
+            if score >= best_score and PROMPT_LITERAL.findall(cached_prompt) == literals:
+                best_score, best_response = score, response
+        
+        return best_response
+    
+    def put(self, model: str, system: str, prompt: str, response: str,
+            embedding: Optional[List[float]] = None):
+        """Store a response, with its prompt embedding if available"""
+        emb = self._normalize(embedding).tobytes() if embedding else None
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+                (self._digest(model, system, prompt), self._digest(model, system), prompt, emb, response)
+            )
+            # REPLACE re-inserts, so rowid order is write order: keep the newest
+            self._db.execute(
+                "DELETE FROM cache WHERE rowid <= (SELECT max(rowid) FROM cache) - ?",
+                (self._max_rows,)
+            )
+            self._db.commit()
+    
+    def discard(self, model: str, system: str, response: str):
+        """Drop every entry in the model/system scope holding this response"""
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM cache WHERE scope=? AND response=?",
+                (self._digest(model, system), response)
+            )
+            self._db.commit()
+    
+    def close(self):
+        with self._lock:
+            self._db.close()
 
 
 class SuperPalmTree:
     """Main SuperPalmTree class"""
     
     def __init__(self):
-        self.ollama_process = None
+        self.ollama = OllamaService(OLLAMA_PORT)
         self.model_name = None
         self.context_size = None
         self.current_plan = None
         self.session_log = []
         
+        # Physical cores only: SMT siblings contend for the same units.
+        # Apple Silicon is left to Ollama's own scheduling (None = unset).
+        if sys.platform == "darwin" and platform.machine() == "arm64":
+            self.num_thread = None
+        else:
+            import psutil  # deferred: only the hardware probes need it
+            self.num_thread = min(psutil.cpu_count(logical=False) or 4, MAX_NUM_THREAD)
+        
         # Ensure directories exist
         SANDBOX_DIR.mkdir(parents=True, exist_ok=True)
         CONFIG_DIR.mkdir(parents=True, exist_ok=True)
         
+        self.cache = ResponseCache(CACHE_DB)
+        self._embed_available: Optional[bool] = None  # EMBED_MODEL installed? Checked on first use
+        
+        # Cleared while a background pull is in flight; chat() waits on it.
+        # _embed() doesn't: EMBED_MODEL is separate from the pulled chat model
+        self._model_ready = threading.Event()
+        self._model_ready.set()
+        
+    def _detect_vram_gb(self) -> Optional[float]:
+        """Free VRAM on the first NVIDIA GPU in GB, or None without one"""
+        try:
+            result = subprocess.run(
+                ["nvidia-smi", "--query-gpu=memory.free", "--format=csv,noheader,nounits"],
+                capture_output=True,
+                text=True,
+                timeout=5
+            )
+            if result.returncode == 0 and result.stdout.strip():
+                return float(result.stdout.split()[0]) / 1024
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            pass
+        return None
+    
     def detect_hardware(self) -> Dict[str, Any]:
         """Detect hardware and set appropriate model"""
-        ram_gb = psutil.virtual_memory().total / (1024**3)
-        
-        if ram_gb >= 16:
-            model = "qwen3:8b"
-            ctx = 32768
-        elif ram_gb >= 8:
-            model = "qwen3:4b"
-            ctx = 16384
-        elif ram_gb >= 4:
-            model = "qwen3:1.7b"
-            ctx = 8192
-        else:
-            model = "qwen3:0.6b"
-            ctx = 4096
+        ram_gb = total_ram_gb()
+        vram_gb = self._detect_vram_gb()
+        
+        tier = next(i for i, (_, min_ram, _, _) in enumerate(MODEL_TIERS) if ram_gb >= min_ram)
+        # Step down to a smaller model while the weights would crowd the GPU
+        if vram_gb is not None:
+            while (tier < len(MODEL_TIERS) - 1
+                   and vram_gb < MODEL_TIERS[tier][3] * VRAM_HEADROOM):
+                tier += 1
+        model, _, ctx, _ = MODEL_TIERS[tier]
             
         return {
             "ram_gb": ram_gb,
+            "vram_gb": vram_gb,
             "model": model,
             "context_size": ctx
         }
     
     def start_ollama(self) -> bool:
         """Start Ollama server"""
-        try:
-            result = subprocess.run(
-                ["curl", "-s", f"http://localhost:{OLLAMA_PORT}/api/tags"],
-                capture_output=True,
-                timeout=2
-            )
-            if result.returncode == 0:
-                return True
-        except:
-            pass
+        if self.ollama.is_listening():
+            return True
         
         print("Starting Ollama...")
-        env = os.environ.copy()
-        env["OLLAMA_HOST"] = f"127.0.0.1:{OLLAMA_PORT}"
-        
-        self.ollama_process = subprocess.Popen(
-            ["ollama", "serve"],
-            env=env,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
+        return self.ollama.start(
+            extra_env={
+                "OLLAMA_NUM_PARALLEL": str(OLLAMA_NUM_PARALLEL),
+                "OLLAMA_MAX_LOADED_MODELS": "1",
+                # q8_0 KV cache halves its memory; it requires flash attention
+                "OLLAMA_FLASH_ATTENTION": "1",
+                "OLLAMA_KV_CACHE_TYPE": "q8_0",
+            },
+            # Same probing as before the move to OllamaService: 10ms doubling
+            # to a 200ms cap, and a 30s deadline - this is the system-wide
+            # `ollama serve`, which binds in seconds, unlike the bundled
+            # binary main.py/runtime.py allow 60s for
+            deadline_s=30,
+            initial_delay=0.01,
+            max_delay=0.2,
             start_new_session=True
         )
+    
+    def pull_model(self, model: str, quiet: bool = False) -> bool:
+        """Pull required model, streaming progress from the Ollama API (errors only if quiet)"""
+        if not quiet:
+            print(f"Pulling {model}...")
+        try:
+            with HTTP.post(
+                f"{self.ollama.base_url}/api/pull",
+                json={"model": model, "stream": True},
+                stream=True,
+                timeout=(5, None)
+            ) as response:
+                if response.status_code != 200:
+                    return False
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    status = json_loads(line)
+                    if "error" in status:
+                        print(f"\n✗ {status['error']}")
+                        return False
+                    if not quiet and status.get("total") and "completed" in status:
+                        percent = 100 * status["completed"] // status["total"]
+                        print(f"\r  {status.get('status', '')} {percent}%", end="", flush=True)
+                    if status.get("status") == "success":
+                        if not quiet:
+                            print()
+                        return True
+        except requests.RequestException as e:
+            print(f"\n✗ Pull failed: {e}")
+        return False
+    
+    def prepare_model_async(self):
+        """Pull and preload the model on a daemon thread; model calls block until it finishes"""
+        self._model_ready.clear()
         
-        for i in range(30):
+        def prepare():
+            # Runs while input() owns the terminal: no \r progress lines,
+            # just one line when done
             try:
-                result = subprocess.run(
-                    ["curl", "-s", f"http://localhost:{OLLAMA_PORT}/api/tags"],
-                    capture_output=True,
-                    timeout=1
-                )
-                if result.returncode == 0:
-                    return True
-            except:
-                pass
-            time.sleep(1)
+                if not self.pull_model(self.model_name, quiet=True):
+                    print("\n⚠️ Could not pull model, will try to use existing")
+                if self.preload_model():
+                    print(f"\n✓ Model {self.model_name} ready")
+            finally:
+                self._model_ready.set()
         
-        return False
+        threading.Thread(target=prepare, daemon=True).start()
     
-    def pull_model(self, model: str) -> bool:
-        """Pull required model"""
-        print(f"Pulling {model}...")
-        result = subprocess.run(
-            ["ollama", "pull", model],
-            capture_output=True
-        )
-        return result.returncode == 0
+    def _estimate_tokens(self, text: str) -> int:
+        """Rough token count (~1.33 tokens per word) plus headroom for the reply"""
+        return int(len(text.split()) * 1.33) + 512
     
-    def chat(self, prompt: str, system: str = None) -> str:
-        """Send chat request to Ollama"""
-        import requests
+    def _context_for(self, prompt: str) -> int:
+        """
+        Per-request num_ctx: the next power of two that fits the prompt,
+        floored at MIN_CONTEXT_SIZE and capped at the hardware maximum.
         
-        url = f"http://localhost:{OLLAMA_PORT}/api/generate"
+        Bucketing keeps the value stable across calls; Ollama reloads the
+        model whenever num_ctx changes.
+        """
+        needed = max(_next_pow2(self._estimate_tokens(prompt)), MIN_CONTEXT_SIZE)
+        return min(self.context_size, needed)
+    
+    def _set_keep_alive(self, keep_alive) -> bool:
+        """Load (keep_alive=-1) or unload (keep_alive=0) the model without generating"""
+        try:
+            response = HTTP.post(
+                f"{self.ollama.base_url}/api/generate",
+                json={
+                    "model": self.model_name,
+                    "prompt": "",
+                    "keep_alive": keep_alive,
+                    "options": {"num_ctx": self._context_for("")}
+                },
+                timeout=OLLAMA_TIMEOUT
+            )
+            return response.ok
+        except requests.RequestException:
+            return False
+    
+    def preload_model(self) -> bool:
+        """Pin the model in memory so the first task doesn't pay the load cost"""
+        return self._set_keep_alive(-1)
+    
+    def _embed(self, text: str) -> Optional[List[float]]:
+        """Embed text with EMBED_MODEL, or None if it isn't installed"""
+        # The chat model would cost a full forward pass per cache miss
+        if self._embed_available is None:
+            self._embed_available = self.ollama.has_model(EMBED_MODEL)
+        if not self._embed_available:
+            return None
+        try:
+            response = HTTP.post(
+                f"{self.ollama.base_url}/api/embed",
+                json={"model": EMBED_MODEL, "input": [text], "keep_alive": MODEL_KEEP_ALIVE},
+                timeout=(OLLAMA_TIMEOUT[0], 60)
+            )
+            if response.ok:
+                return json_loads(response.content).get("embeddings", [None])[0]
+        except requests.RequestException:
+            pass
+        return None
+    
+    def _cache_lookup(self, prompt: str, system: str) -> Tuple[Optional[str], Optional[List[float]]]:
+        """
+        Exact then semantic cache lookup.
+        
+        Returns (hit, embedding); on a miss the prompt's embedding is returned
+        so the caller can store a response once it has validated it.
+        """
+        hit = self.cache.get(self.model_name, system, prompt)
+        if hit is not None:
+            return hit, None
+        
+        embedding = self._embed(prompt)
+        if embedding:
+            hit = self.cache.get_similar(self.model_name, system, prompt, embedding)
+        return hit, embedding
+    
+    def chat(self, prompt: str, system: str = None, stop_at_json: bool = False) -> str:
+        """
+        Send chat request to Ollama, streaming the response.
+        
+        With stop_at_json, the stream is closed as soon as the first complete
+        JSON object has arrived, skipping any trailing commentary.
+        """
+        self._model_ready.wait()
+        url = f"{self.ollama.base_url}/api/generate"
         
         full_prompt = prompt
         if system:
@@ -217,18 +654,35 @@ class SuperPalmTree:
         data = {
             "model": self.model_name,
             "prompt": full_prompt,
-            "stream": False,
+            "stream": True,
+            "keep_alive": MODEL_KEEP_ALIVE,
             "options": {
-                "num_ctx": self.context_size,
+                "num_ctx": self._context_for(full_prompt),
+                "num_batch": NUM_BATCH,
                 "temperature": 0.7
             }
         }
+        if self.num_thread:
+            data["options"]["num_thread"] = self.num_thread
         
         try:
-            response = requests.post(url, json=data, timeout=300)
-            if response.status_code == 200:
-                return response.json().get("response", "")
-            return f"Error: HTTP {response.status_code}"
+            with HTTP.post(url, json=data, timeout=OLLAMA_TIMEOUT, stream=True) as response:
+                if response.status_code != 200:
+                    return f"Error: HTTP {response.status_code}"
+                
+                stopper = _JsonStreamStop() if stop_at_json else None
+                parts = []
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json_loads(line)
+                    text = chunk.get("response", "")
+                    parts.append(text)
+                    if chunk.get("done"):
+                        break
+                    if stopper is not None and stopper.feed(text):
+                        break
+                return "".join(parts)
         except Exception as e:
             return f"Error: {e}"
     
@@ -240,22 +694,21 @@ class SuperPalmTree:
 
 Create a detailed execution plan. Respond with valid JSON only."""
         
-        response = self.chat(prompt, PLANNER_SYSTEM_PROMPT)
+        response, embedding = self._cache_lookup(prompt, PLANNER_SYSTEM_PROMPT)
+        cached = response is not None
+        if not cached:
+            response = self.chat(prompt, PLANNER_SYSTEM_PROMPT, stop_at_json=True)
         
         try:
-            # Extract JSON from response
-            json_str = response
-            if "```json" in response:
-                json_str = response.split("```json")[1].split("```")[0]
-            elif "```" in response:
-                json_str = response.split("```")[1].split("```")[0]
-            
-            plan_data = json.loads(json_str.strip())
+            # Extract JSON from response (fenced or bare)
+            plan_data = json_loads(_extract_json(response))
             
             steps = [
                 TaskStep(**step_data)
                 for step_data in plan_data.get("steps", [])
             ]
+            if not steps:
+                raise ValueError("plan has no steps")
             
             plan = TaskPlan(
                 task_summary=plan_data.get("task_summary", "Unknown task"),
@@ -264,11 +717,18 @@ Create a detailed execution plan. Respond with valid JSON only."""
                 fallback_plan=plan_data.get("fallback_plan", "Ask user for help")
             )
             
+            # Only a plan that parsed is worth replaying
+            if not cached:
+                self.cache.put(self.model_name, PLANNER_SYSTEM_PROMPT, prompt, response, embedding)
+            
             print(f"✓ Plan created: {len(steps)} steps, ~{plan.estimated_time}")
             return plan
             
         except Exception as e:
             print(f"✗ Failed to parse plan: {e}")
+            if cached:
+                # Left over from before plans were validated; don't serve it again
+                self.cache.discard(self.model_name, PLANNER_SYSTEM_PROMPT, response)
             # Return simple fallback plan
             return TaskPlan(
                 task_summary=user_request,
@@ -286,14 +746,15 @@ Create a detailed execution plan. Respond with valid JSON only."""
             )
     
     def execute_step(self, step: TaskStep) -> bool:
-        """Execute a single step"""
-        print(f"\n  Step {step.step_num}: {step.purpose}")
-        step.started_at = datetime.now().isoformat()
+        """Execute a single step, recording timing/status in its plan's columns"""
+        columns, row = step.columns, step.index
+        columns.started_ns[row] = time.monotonic_ns()
+        columns.status_code[row] = STEP_RUNNING
         
         # Simple execution - can be extended with actual browser/shell tools
         prompt = f"""Execute this step:
 Tool: {step.tool}
-Parameters: {json.dumps(step.params)}
+Parameters: {json_dumps(step.params)}
 Purpose: {step.purpose}
 
 Execute and report results."""
@@ -301,22 +762,59 @@ Execute and report results."""
         response = self.chat(prompt, EXECUTOR_SYSTEM_PROMPT)
         
         step.result = response
-        step.status = "completed" if "SUCCESS" in response else "failed"
-        step.completed_at = datetime.now().isoformat()
+        ok = "SUCCESS" in response
+        columns.completed_ns[row] = time.monotonic_ns()
+        columns.status_code[row] = STEP_OK if ok else STEP_FAILED
+        return ok
+    
+    def _batch_steps(self, steps: List[TaskStep]) -> List[List[TaskStep]]:
+        """
+        Group steps into batches that may run concurrently.
         
-        print(f"  Status: {step.status}")
-        return step.status == "completed"
+        Browser steps share one page, so each runs alone and in order.
+        Consecutive shell/file steps are batched up to OLLAMA_NUM_PARALLEL,
+        so the server can decode them together; a step whose params refer
+        to an earlier step's output starts a new batch.
+        """
+        batches = []
+        for step in steps:
+            sequential = (
+                step.tool.startswith("browser_")
+                or STEP_REFERENCE.search(json_dumps(step.params)) is not None
+            )
+            if (sequential or not batches
+                    or batches[-1][0].tool.startswith("browser_")
+                    or len(batches[-1]) >= OLLAMA_NUM_PARALLEL):
+                batches.append([step])
+            else:
+                batches[-1].append(step)
+        return batches
     
     def execute_plan(self, plan: TaskPlan) -> bool:
         """Execute all steps in plan"""
         print(f"\n🚀 Executing plan: {plan.task_summary}")
         
-        success_count = 0
-        for step in plan.steps:
-            if self.execute_step(step):
-                success_count += 1
-            else:
-                print(f"  ⚠️ Step {step.step_num} failed, trying fallback...")
+        with ThreadPoolExecutor(max_workers=OLLAMA_NUM_PARALLEL) as pool:
+            for batch in self._batch_steps(plan.steps):
+                # Steps in a batch run on pool threads; all console output
+                # comes from here, in step order, so lines never interleave
+                for step in batch:
+                    print(f"\n  Step {step.step_num}: {step.purpose}")
+                results = list(pool.map(self.execute_step, batch))
+                for step, ok in zip(batch, results):
+                    if len(batch) == 1:
+                        print(f"  Status: {step.status}")
+                    else:
+                        print(f"  Step {step.step_num} status: {step.status}")
+                    if not ok:
+                        print(f"  ⚠️ Step {step.step_num} failed, trying fallback...")
+        
+        success_count = plan.columns.count(STEP_OK)
+        self.session_log.append({
+            "task_summary": plan.task_summary,
+            "created_at": plan.created_at,
+            **plan.columns.to_dict()
+        })
         
         print(f"\n✓ Completed: {success_count}/{len(plan.steps)} steps")
         return success_count == len(plan.steps)
@@ -349,9 +847,9 @@ Execute and report results."""
             print("   curl -fsSL https://ollama.com/install.sh | sh")
             return
         
-        # Pull model
-        if not self.pull_model(self.model_name):
-            print("⚠️ Could not pull model, will try to use existing")
+        # Pull and load the model in the background; the prompt is usable
+        # right away and the first task waits only for what's left
+        self.prepare_model_async()
         
         print(f"\n✨ {APP_NAME} ready! Type 'exit' to quit.\n")
         
@@ -377,8 +875,11 @@ Execute and report results."""
     
     def cleanup(self):
         """Cleanup resources"""
-        if self.ollama_process:
-            self.ollama_process.terminate()
+        if self.model_name:
+            # Free the model's RAM/VRAM before shutting the server down
+            self._set_keep_alive(0)
+        self.ollama.stop()
+        self.cache.close()
 
 
 def main():
@@ -400,6 +901,7 @@ def main():
                 sys.exit(1)
             
             agent.pull_model(agent.model_name)
+            agent.preload_model()
             agent.run_task(command)
         else:
             # Interactive mode
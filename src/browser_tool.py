@@ -4,12 +4,14 @@ SuperPalmTree Browser Tool - DOM/ARIA Approach
 Uses Playwright for browser automation with ARIA accessibility tree snapshots.
 Returns semantic element refs instead of heavy HTML - optimized for small models.
 
-Port: 9223 (isolated from system Chrome on 9222)
+Transport: CDP over Playwright's --remote-debugging-pipe, or attaches to a
+           Chromium already serving DevTools on port 9223
 Profile: ~/.superpalmtree/chromium/
 """
 
 import asyncio
-import re
+import shutil
+from functools import lru_cache
 from typing import Optional, Tuple, Dict, List, Any
 from pathlib import Path
 from dataclasses import dataclass
@@ -18,6 +20,319 @@ from dataclasses import dataclass
 CHROME_DEBUG_PORT = 9223
 DATA_DIR = Path.home() / ".superpalmtree"
 CHROMIUM_PROFILE = DATA_DIR / "chromium"
+BROWSER_POOL_RECYCLE_AFTER = 100  # Relaunch Chromium after this many checkouts
+MIN_DEV_SHM_BYTES = 256 * 1024 * 1024  # Below this, Chromium falls back to /tmp
+
+# Generic/uninteresting accessibility roles
+SKIP_ROLES = frozenset({"none", "generic", "group", "document", "main", "navigation", "banner", "contentinfo"})
+
+# Roles that are actionable or informative
+INCLUDE_ROLES = frozenset({
+    "heading", "link", "button", "textbox", "checkbox", "radio",
+    "combobox", "listbox", "option", "menuitem", "tab", "tabpanel",
+    "img", "figure", "article", "section", "list", "listitem",
+    "text", "paragraph", "table", "row", "cell", "form"
+})
+
+# Precomputed indentation prefixes for formatted accessibility trees
+INDENTS = tuple("  " * i for i in range(64))
+
+# Interactive roles that get a [ref=eN] handle
+REF_ROLES = frozenset({"link", "button", "textbox", "checkbox", "radio", "combobox", "option", "menuitem", "tab"})
+
+# Page-side helpers installed once per document. Calls pass arguments instead
+# of splicing them into the source, so the script text never changes and V8
+# reuses its compiled code (and selectors need no quoting).
+JS_HELPERS = """
+if (!window.__spt) {
+window.__spt = {
+    doc: Math.random().toString(36).slice(2),  // Identifies this document
+    mut: 0,  // DOM mutation counter
+    find(sel) {
+        const el = document.querySelector(sel);
+        return el ? {tag: el.tagName.toLowerCase(), text: (el.innerText || el.value || '').slice(0, 200)} : null;
+    },
+    fill(pairs) {
+        let filled = 0;
+        for (const [sel, value] of pairs) {
+            const el = document.querySelector(sel);
+            if (!el) continue;
+            el.focus();
+            el.value = value;
+            el.dispatchEvent(new Event('input', {bubbles: true}));
+            el.dispatchEvent(new Event('change', {bubbles: true}));
+            filled++;
+        }
+        return filled;
+    },
+    isLogin() {
+        // Only the title and the password field's form are scanned, not the whole body
+        const pw = document.querySelector('input[type=password]');
+        if (!pw) return false;
+        const form = pw.closest('form') || document.querySelector('form');
+        return /log ?in|sign in|password/i.test(document.title + ' ' + (form ? form.textContent : ''));
+    },
+    inspect(maxChars) {
+        const text = document.body ? document.body.innerText : '';
+        return {
+            url: location.href,
+            content: text.length > maxChars ? text.slice(0, maxChars) + '...' : text,
+            isLogin: this.isLogin()
+        };
+    }
+};
+// Count DOM changes, ignoring the data-spt-ref tags written by snapshots
+new MutationObserver((records) => {
+    if (records.some(r => r.attributeName !== 'data-spt-ref')) window.__spt.mut++;
+}).observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+}
+"""
+
+MAX_NAME_CHARS = 200  # Longest element name sent back from the page
+
+# Collects headings, links, buttons and text inputs in one pass. Each actionable
+# element is tagged with data-spt-ref so refs resolve to an exact selector.
+# Returns {token, elements}; elements is null when the DOM is unchanged since
+# the snapshot identified by knownToken.
+JS_SNAPSHOT = """
+([maxName, knownToken]) => {
+    // Unchanged since the caller's last snapshot: skip the walk entirely
+    const spt = window.__spt;
+    const token = spt ? `${spt.doc}:${spt.mut}:${location.href}` : null;
+    if (token !== null && token === knownToken) return {token, elements: null};
+
+    document.querySelectorAll('[data-spt-ref]').forEach(el => el.removeAttribute('data-spt-ref'));
+    // Input types Playwright does not give the textbox role; every other
+    // type (password, date, time, unknown values...) is a textbox
+    const NOT_TEXTBOX = new Set(['hidden', 'file', 'button', 'submit', 'reset', 'image',
+                                 'checkbox', 'radio', 'range', 'number', 'search']);
+    const roleOf = (el) => {
+        const explicit = el.getAttribute('role');
+        if (explicit) return explicit;
+        const tag = el.tagName.toLowerCase();
+        if (/^h[1-6]$/.test(tag)) return 'heading';
+        if (tag === 'a' && el.hasAttribute('href')) return 'link';
+        if (tag === 'button') return 'button';
+        if (tag === 'textarea') return 'textbox';
+        if (tag === 'input') {
+            const type = (el.getAttribute('type') || '').toLowerCase();
+            if (['button', 'submit', 'reset', 'image'].includes(type)) return 'button';
+            if (type === 'search') return 'searchbox';
+            if (!NOT_TEXTBOX.has(type)) return 'textbox';
+        }
+        return null;
+    };
+    const visible = (el) => el.checkVisibility ? el.checkVisibility() : el.getClientRects().length > 0;
+    const out = [];
+    let next = 0;
+    for (const el of document.querySelectorAll('h1,h2,h3,h4,h5,h6,a,button,input,textarea,[role]')) {
+        const role = roleOf(el);
+        if (!['heading', 'link', 'button', 'textbox'].includes(role) || !visible(el)) continue;
+        let name;
+        if (role === 'textbox') {
+            name = el.getAttribute('placeholder') || 'input';
+        } else {
+            name = (el.tagName === 'INPUT' ? el.value : el.textContent || '').trim();
+            if (!name) continue;
+        }
+        name = name.slice(0, maxName);
+        const item = {role, name};
+        if (role !== 'heading') {
+            el.setAttribute('data-spt-ref', String(next));
+            item.selector = `[data-spt-ref="${next++}"]`;
+        }
+        out.push(item);
+    }
+    return {token, elements: out};
+}
+"""
+
+# Constant call-site for JS_HELPERS: (name, args) => window.__spt[name](...args)
+JS_CALL_HELPER = "([name, args]) => window.__spt[name](...args)"
+
+
+# CSS string escapes: quotes and backslashes get a backslash; control
+# characters become hex escapes ("\a " for newline), since CSS would read
+# "\n" as a plain "n"; NUL is not allowed and becomes U+FFFD
+_CSS_STRING_ESCAPES = {ord("\\"): "\\\\", ord('"'): '\\"', 0: "\ufffd", 0x7F: "\\7f "}
+_CSS_STRING_ESCAPES.update({c: f"\\{c:x} " for c in range(1, 0x20)})
+
+
+@lru_cache(maxsize=1024)
+def _build_selector(role: str, name: str) -> str:
+    """Build CSS selector from role and accessible name (memoized)"""
+    safe_name = name.translate(_CSS_STRING_ESCAPES)
+
+    role_selectors = {
+        "link": f'a:has-text("{safe_name}")',
+        "button": f'button:has-text("{safe_name}"), [role="button"]:has-text("{safe_name}")',
+        "textbox": f'input[placeholder*="{safe_name}"], input[aria-label*="{safe_name}"], textarea[placeholder*="{safe_name}"]',
+        "checkbox": f'input[type="checkbox"][aria-label*="{safe_name}"]',
+        "radio": f'input[type="radio"][aria-label*="{safe_name}"]',
+        "combobox": f'select[aria-label*="{safe_name}"], [role="combobox"]:has-text("{safe_name}")',
+        "option": f'option:has-text("{safe_name}")',
+        "menuitem": f'[role="menuitem"]:has-text("{safe_name}")',
+        "tab": f'[role="tab"]:has-text("{safe_name}")',
+    }
+
+    return role_selectors.get(role, f':has-text("{safe_name}")')
+
+
+def _dev_shm_free() -> int:
+    """Free bytes in /dev/shm (0 where it doesn't exist)"""
+    try:
+        return shutil.disk_usage("/dev/shm").free
+    except OSError:
+        return 0
+
+
+def _endpoint_up(endpoint: str) -> bool:
+    """Whether a Chromium DevTools endpoint answers /json/version"""
+    import urllib.request
+
+    try:
+        with urllib.request.urlopen(f"{endpoint}/json/version", timeout=0.2):
+            return True
+    except OSError:
+        return False
+
+
+class _BrowserPool:
+    """
+    Keeps one launched Chromium context warm across CDPBrowser start()/stop().
+
+    The persistent profile can only be open in one Chromium at a time, so the
+    pool holds a single context; asking for the other headless mode relaunches.
+    Each checkout gets its own page, and the browser is recycled after
+    BROWSER_POOL_RECYCLE_AFTER checkouts once no page is in use.
+
+    If a debuggable Chromium is already listening on CHROME_DEBUG_PORT, the
+    pool attaches to it instead of launching, and only disconnects on close.
+
+    Playwright objects belong to the event loop that created them, so a pool
+    used from a new loop (e.g. a second asyncio.run()) starts over.
+    """
+
+    def __init__(self):
+        self._reset()
+        self._loop = None
+
+    def _reset(self):
+        self._playwright = None
+        self._context = None
+        self._attached = None  # Browser we connected to over CDP, if any
+        self._headless = True
+        self._checkouts = 0
+        self._active = 0
+        self._lock = asyncio.Lock()
+
+    def _bind_loop(self):
+        """Drop state left over from a previous event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if self._loop is not None:
+                self._reset()
+            self._loop = loop
+
+    async def _launch(self, headless: bool):
+        from playwright.async_api import async_playwright
+
+        CHROMIUM_PROFILE.mkdir(parents=True, exist_ok=True)
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+
+        # Reuse a running debug endpoint when there is one
+        endpoint = f"http://127.0.0.1:{CHROME_DEBUG_PORT}"
+        if await asyncio.to_thread(_endpoint_up, endpoint):
+            self._attached = await self._playwright.chromium.connect_over_cdp(endpoint)
+            if self._attached.contexts:
+                context = self._attached.contexts[0]
+            else:
+                context = await self._attached.new_context(viewport={"width": 1280, "height": 800})
+            await context.add_init_script(script=JS_HELPERS)
+            return context
+
+        # Playwright passes --disable-dev-shm-usage by default, which moves
+        # Chromium's shared memory to disk; keep tmpfs when it is big enough
+        ignore_args = ["--disable-dev-shm-usage"] if _dev_shm_free() >= MIN_DEV_SHM_BYTES else []
+
+        # Launch with persistent context for isolated profile
+        context = await self._playwright.chromium.launch_persistent_context(
+            str(CHROMIUM_PROFILE),
+            headless=headless,
+            viewport={"width": 1280, "height": 800},
+            user_agent="Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
+            ignore_default_args=ignore_args
+        )
+        # Install page helpers for every future document
+        await context.add_init_script(script=JS_HELPERS)
+        return context
+
+    async def _close_context(self):
+        if self._attached:
+            await self._attached.close()  # Disconnects; the browser keeps running
+        elif self._context:
+            await self._context.close()
+        self._attached = None
+        self._context = None
+        self._checkouts = 0
+
+    async def warmup(self, headless: bool = True):
+        """Launch the browser ahead of the first start()"""
+        self._bind_loop()
+        async with self._lock:
+            if self._context is None:
+                self._context = await self._launch(headless)
+                self._headless = headless
+
+    async def acquire(self, headless: bool):
+        """Check out the warm context (launching or relaunching as needed)"""
+        self._bind_loop()
+        async with self._lock:
+            if self._context is not None:
+                # An attached browser serves any mode; a launched one must match
+                wrong_mode = self._attached is None and self._headless != headless
+                if wrong_mode and self._active:
+                    raise RuntimeError("Browser is in use in a different mode")
+                if wrong_mode or (self._checkouts >= BROWSER_POOL_RECYCLE_AFTER and not self._active):
+                    await self._close_context()
+            if self._context is None:
+                self._context = await self._launch(headless)
+                self._headless = headless
+            self._checkouts += 1
+            self._active += 1
+            return self._context
+
+    async def release(self, page):
+        """Return a checkout: close its page but keep the browser running"""
+        self._bind_loop()
+        async with self._lock:
+            if page and not page.is_closed():
+                await page.close()
+            self._active = max(self._active - 1, 0)
+
+    async def close(self):
+        """Shut down the browser and Playwright"""
+        self._bind_loop()
+        async with self._lock:
+            await self._close_context()
+            if self._playwright:
+                await self._playwright.stop()
+            self._playwright = None
+            self._active = 0
+
+
+_pool = _BrowserPool()
+
+
+async def warmup(headless: bool = True):
+    """Pre-launch the shared browser (e.g. during app startup)"""
+    await _pool.warmup(headless)
+
+
+async def shutdown():
+    """Close the shared browser; call once when the app exits"""
+    await _pool.close()
 
 
 @dataclass
@@ -50,6 +365,8 @@ class CDPBrowser:
         self.current_url = ""
         self.element_refs: Dict[str, ElementRef] = {}
         self._ref_counter = 0
+        self._snapshot_token: Optional[str] = None  # Page state of the cached snapshot
+        self._snapshot_text = ""
 
     async def start(self, headless: bool = True) -> bool:
         """
@@ -62,35 +379,71 @@ class CDPBrowser:
             True if started successfully
         """
         try:
-            from playwright.async_api import async_playwright
-
             self.is_headless = headless
 
-            # Ensure profile directory exists
-            CHROMIUM_PROFILE.mkdir(parents=True, exist_ok=True)
-
-            # Start Playwright
-            self.playwright = await async_playwright().start()
-
-            # Launch with persistent context for isolated profile
-            self.context = await self.playwright.chromium.launch_persistent_context(
-                str(CHROMIUM_PROFILE),
-                headless=headless,
-                viewport={"width": 1280, "height": 800},
-                user_agent="Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36"
-            )
-
-            # Get page
-            self.page = self.context.pages[0] if self.context.pages else await self.context.new_page()
+            # Check out the pooled (already warm) browser and open our own page
+            self.context = await _pool.acquire(headless)
+            self.page = await self.context.new_page()
             self.browser = self.context  # For compatibility
+            await self.page.evaluate(JS_HELPERS)
 
-            print(f"[browser] Started {'headless' if headless else 'visible'} on port {CHROME_DEBUG_PORT}")
+            print(f"[browser] Started {'headless' if headless else 'visible'}")
             return True
 
         except Exception as e:
             print(f"[browser] Failed to start: {e}")
+            # Hand the checkout back, or the pool could never recycle
+            if self.context:
+                try:
+                    await _pool.release(self.page)
+                except Exception:
+                    pass
+            self.page = None
+            self.context = None
+            self.browser = None
             return False
 
+    async def _call_helper(self, name: str, *args) -> Any:
+        """Invoke a window.__spt helper with arguments passed by value"""
+        return await self.page.evaluate(JS_CALL_HELPER, [name, list(args)])
+
+    async def find_element(self, selector: str) -> Optional[Dict[str, str]]:
+        """Look up an element by CSS selector; returns its tag and text, or None"""
+        if not self.page:
+            return None
+        try:
+            return await self._call_helper("find", selector)
+        except Exception as e:
+            print(f"[browser] Find failed: {e}")
+            return None
+
+    async def is_login_page(self) -> bool:
+        """Heuristic: page has a password field in a login/sign in form"""
+        if not self.page:
+            return False
+        try:
+            return bool(await self._call_helper("isLogin"))
+        except Exception:
+            return False
+
+    async def inspect_page(self, max_chars: int = 2000) -> Dict[str, Any]:
+        """
+        Read URL, visible text (truncated) and login state in one round-trip.
+
+        Returns:
+            Dict with "url", "content" and "isLogin"
+        """
+        if not self.page:
+            return {"url": "", "content": "", "isLogin": False}
+        try:
+            data = await self._call_helper("inspect", max_chars)
+        except Exception as e:
+            print(f"[browser] Inspect failed: {e}")
+            return {"url": self.page.url, "content": "", "isLogin": False}
+
+        self.current_url = data["url"]
+        return data
+
     async def navigate(self, url: str, wait_for: str = "domcontentloaded") -> Tuple[bool, str]:
         """
         Navigate to URL.
@@ -127,110 +480,92 @@ class CDPBrowser:
 
     async def snapshot(self) -> str:
         """
-        Get semantic elements from page using Playwright's role selectors.
+        Get semantic elements from page in a single evaluate call.
         Returns elements with refs for interaction.
         """
         if not self.page:
             return "[error] Browser not started"
 
         try:
+            result = await self.page.evaluate(JS_SNAPSHOT, [MAX_NAME_CHARS, self._snapshot_token])
+            elements = result["elements"]
+            if elements is None:
+                return self._snapshot_text
+
             self.element_refs.clear()
             self._ref_counter = 0
             lines = [f"[page] {self.current_url}", ""]
 
-            # Get headings
-            headings = await self.page.get_by_role("heading").all()
-            for h in headings:
-                text = await h.text_content()
-                if text:
-                    lines.append(f"# {text.strip()}")
-
-            # Get links with refs
-            links = await self.page.get_by_role("link").all()
-            for link in links:
-                text = await link.text_content()
-                if text and text.strip():
-                    ref = self._add_ref("link", text.strip(), link)
-                    lines.append(f"- link \"{text.strip()}\" [ref={ref}]")
-
-            # Get buttons with refs
-            buttons = await self.page.get_by_role("button").all()
-            for btn in buttons:
-                text = await btn.text_content()
-                if text and text.strip():
-                    ref = self._add_ref("button", text.strip(), btn)
-                    lines.append(f"- button \"{text.strip()}\" [ref={ref}]")
-
-            # Get inputs with refs
-            inputs = await self.page.get_by_role("textbox").all()
-            for inp in inputs:
-                placeholder = await inp.get_attribute("placeholder") or "input"
-                ref = self._add_ref("textbox", placeholder, inp)
-                lines.append(f"- input \"{placeholder}\" [ref={ref}]")
-
-            return "\n".join(lines)
+            by_role: Dict[str, List[Dict[str, str]]] = {"heading": [], "link": [], "button": [], "textbox": []}
+            for el in elements:
+                by_role[el["role"]].append(el)
+
+            # Headings, then links, buttons and inputs with refs
+            for h in by_role["heading"]:
+                lines.append(f"# {h['name']}")
+            for el in by_role["link"] + by_role["button"]:
+                ref = self._add_ref(el["role"], el["name"], el["selector"])
+                lines.append(f"- {el['role']} \"{el['name']}\" [ref={ref}]")
+            for el in by_role["textbox"]:
+                ref = self._add_ref("textbox", el["name"], el["selector"])
+                lines.append(f"- input \"{el['name']}\" [ref={ref}]")
+
+            self._snapshot_token = result["token"]
+            self._snapshot_text = "\n".join(lines)
+            return self._snapshot_text
 
         except Exception as e:
             return f"[error] {e}"
 
-    def _add_ref(self, role: str, name: str, locator) -> str:
+    def _add_ref(self, role: str, name: str, selector: str) -> str:
         """Add element ref and return ref ID"""
         self._ref_counter += 1
         ref = f"e{self._ref_counter}"
-        self.element_refs[ref] = ElementRef(ref=ref, role=role, name=name, selector="")
-        self.element_refs[ref].locator = locator  # Store actual locator
+        self.element_refs[ref] = ElementRef(ref=ref, role=role, name=name, selector=selector)
         return ref
 
     def _format_node(self, node: Dict, lines: List[str], indent: int):
-        """Recursively format accessibility tree node"""
-        role = node.get("role", "")
-        name = node.get("name", "")
-
-        # Skip generic/uninteresting nodes
-        skip_roles = {"none", "generic", "group", "document", "main", "navigation", "banner", "contentinfo"}
-
-        # Include roles that are actionable or informative
-        include_roles = {
-            "heading", "link", "button", "textbox", "checkbox", "radio",
-            "combobox", "listbox", "option", "menuitem", "tab", "tabpanel",
-            "img", "figure", "article", "section", "list", "listitem",
-            "text", "paragraph", "table", "row", "cell", "form"
-        }
-
-        if role in include_roles and name:
-            # Generate ref for interactive elements
-            ref = ""
-            if role in {"link", "button", "textbox", "checkbox", "radio", "combobox", "option", "menuitem", "tab"}:
-                ref = self._generate_ref(node, role, name)
-
-            # Format line
-            prefix = "  " * indent
-            if role == "heading":
-                level = node.get("level", 1)
-                line = f"{prefix}{'#' * level} {name}"
-            elif role == "link":
-                line = f"{prefix}- link \"{name}\" [ref={ref}]"
-            elif role == "button":
-                line = f"{prefix}- button \"{name}\" [ref={ref}]"
-            elif role == "textbox":
-                value = node.get("value", "")
-                placeholder = f" ({value})" if value else ""
-                line = f"{prefix}- input \"{name}\"{placeholder} [ref={ref}]"
-            elif role == "img":
-                line = f"{prefix}- image \"{name}\""
-            elif role == "listitem":
-                line = f"{prefix}  * {name}"
-            else:
-                line = f"{prefix}- {role}: \"{name}\""
-                if ref:
-                    line += f" [ref={ref}]"
+        """Format an accessibility tree (depth-first, without recursion)"""
+        stack = [(node, indent)]
+        while stack:
+            node, indent = stack.pop()
+            role = node.get("role", "")
+            name = node.get("name", "")
+
+            if role in INCLUDE_ROLES and name:
+                # Generate ref for interactive elements
+                ref = ""
+                if role in REF_ROLES:
+                    ref = self._generate_ref(node, role, name)
+
+                # Format line
+                prefix = INDENTS[indent] if indent < len(INDENTS) else "  " * indent
+                if role == "heading":
+                    level = node.get("level", 1)
+                    line = f"{prefix}{'#' * level} {name}"
+                elif role == "link":
+                    line = f"{prefix}- link \"{name}\" [ref={ref}]"
+                elif role == "button":
+                    line = f"{prefix}- button \"{name}\" [ref={ref}]"
+                elif role == "textbox":
+                    value = node.get("value", "")
+                    placeholder = f" ({value})" if value else ""
+                    line = f"{prefix}- input \"{name}\"{placeholder} [ref={ref}]"
+                elif role == "img":
+                    line = f"{prefix}- image \"{name}\""
+                elif role == "listitem":
+                    line = f"{prefix}  * {name}"
+                else:
+                    line = f"{prefix}- {role}: \"{name}\""
+                    if ref:
+                        line += f" [ref={ref}]"
 
-            lines.append(line)
+                lines.append(line)
 
-        # Process children
-        children = node.get("children", [])
-        for child in children:
-            self._format_node(child, lines, indent + (1 if role in include_roles else 0))
+            # Queue children so they pop in document order
+            child_indent = indent + (1 if role in INCLUDE_ROLES else 0)
+            children = node.get("children", [])
+            stack.extend((child, child_indent) for child in reversed(children))
 
     def _generate_ref(self, node: Dict, role: str, name: str) -> str:
         """Generate a reference ID and store element info"""
@@ -238,7 +573,7 @@ class CDPBrowser:
         ref = f"e{self._ref_counter}"
 
         # Build selector based on role and name
-        selector = self._build_selector(role, name)
+        selector = _build_selector(role, name)
 
         self.element_refs[ref] = ElementRef(
             ref=ref,
@@ -249,25 +584,6 @@ class CDPBrowser:
 
         return ref
 
-    def _build_selector(self, role: str, name: str) -> str:
-        """Build CSS selector from role and accessible name"""
-        # Escape special characters in name for selector
-        safe_name = name.replace('"', '\\"').replace("'", "\\'")
-
-        role_selectors = {
-            "link": f'a:has-text("{safe_name}")',
-            "button": f'button:has-text("{safe_name}"), [role="button"]:has-text("{safe_name}")',
-            "textbox": f'input[placeholder*="{safe_name}"], input[aria-label*="{safe_name}"], textarea[placeholder*="{safe_name}"]',
-            "checkbox": f'input[type="checkbox"][aria-label*="{safe_name}"]',
-            "radio": f'input[type="radio"][aria-label*="{safe_name}"]',
-            "combobox": f'select[aria-label*="{safe_name}"], [role="combobox"]:has-text("{safe_name}")',
-            "option": f'option:has-text("{safe_name}")',
-            "menuitem": f'[role="menuitem"]:has-text("{safe_name}")',
-            "tab": f'[role="tab"]:has-text("{safe_name}")',
-        }
-
-        return role_selectors.get(role, f':has-text("{safe_name}")')
-
     async def click(self, ref_or_selector: str) -> bool:
         """
         Click an element by ref or CSS selector.
@@ -298,8 +614,8 @@ class CDPBrowser:
             # Try to click
             await self.page.click(selector, timeout=10000)
 
-            # Wait for potential navigation/updates
-            await asyncio.sleep(0.5)
+            # Wait for a click-triggered navigation, if any; returns at once otherwise
+            await self.page.wait_for_load_state("domcontentloaded", timeout=15000)
 
             return True
 
@@ -307,13 +623,17 @@ class CDPBrowser:
             print(f"[browser] Click failed: {e}")
             return False
 
-    async def type_text(self, ref_or_selector: str, text: str) -> bool:
+    async def type_text(self, ref_or_selector: str, text: str, slow: bool = False) -> bool:
         """
         Type text into an input element.
 
+        The whole string is inserted in one step; pass slow=True for pages
+        that only react to real per-character key events.
+
         Args:
             ref_or_selector: Element ref or CSS selector
             text: Text to type
+            slow: Send individual key presses instead of a single insert
 
         Returns:
             True if typed successfully
@@ -322,19 +642,21 @@ class CDPBrowser:
             return False
 
         try:
-            # Resolve ref to selector
+            # Resolve ref to a locator
             if ref_or_selector.startswith("e") and ref_or_selector[1:].isdigit():
                 element_info = self.element_refs.get(ref_or_selector)
                 if element_info:
-                    selector = element_info.selector
+                    locator = self.page.locator(element_info.selector)
                     print(f"[browser] Typing into {ref_or_selector} ({element_info.name})")
                 else:
                     return False
             else:
-                selector = ref_or_selector
+                locator = self.page.locator(ref_or_selector)
 
-            # Clear and type
-            await self.page.fill(selector, text, timeout=10000)
+            # Clear, then insert in one go (or key by key when asked)
+            await locator.fill("" if slow else text, timeout=10000)
+            if slow:
+                await locator.press_sequentially(text, timeout=10000)
 
             return True
 
@@ -342,6 +664,25 @@ class CDPBrowser:
             print(f"[browser] Type failed: {e}")
             return False
 
+    async def fill_form(self, fields: Dict[str, str]) -> int:
+        """
+        Fill several inputs in a single page round-trip.
+
+        Args:
+            fields: Mapping of CSS selector to value
+
+        Returns:
+            Number of fields that were found and filled
+        """
+        if not self.page:
+            return 0
+
+        try:
+            return await self._call_helper("fill", list(fields.items()))
+        except Exception as e:
+            print(f"[browser] Fill form failed: {e}")
+            return 0
+
     async def get_page_content(self) -> str:
         """
         Get page content as ARIA snapshot (not raw HTML).
@@ -378,21 +719,16 @@ class CDPBrowser:
             return None
 
     async def stop(self):
-        """Stop browser and cleanup"""
+        """Close this browser's page; the pooled Chromium stays warm for reuse"""
         try:
-            if self.page:
-                await self.page.close()
             if self.context:
-                await self.context.close()
-            if self.browser:
-                await self.browser.close()
-            if self.playwright:
-                await self.playwright.stop()
+                await _pool.release(self.page)
 
             self.page = None
             self.context = None
             self.browser = None
             self.playwright = None
+            self._snapshot_token = None
 
             print("[browser] Stopped")
 
@@ -450,9 +786,16 @@ async def test_browser():
 
     print("\nStopping browser...")
     await browser.stop()
+    await shutdown()
 
     print("Done!")
 
 
 if __name__ == "__main__":
-    asyncio.run(test_browser())
+    # uvloop speeds up the event loop's socket/pipe I/O when installed
+    try:
+        import uvloop
+    except ImportError:
+        uvloop = None
+
+    (uvloop.run if uvloop else asyncio.run)(test_browser())
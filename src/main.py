@@ -7,15 +7,19 @@ No external dependencies - everything bundled and works immediately
 
 import os
 import sys
-import json
 import time
+import hashlib
 import http.server
-import socketserver
+import shutil
+import signal
 import threading
 import subprocess
 from pathlib import Path
-from typing import Dict, Any, Optional
-import psutil
+from typing import Dict, Any, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+from ollama_service import (
+    HTTP, OLLAMA_TIMEOUT, OllamaService, get_platform, json_dumpb, json_loads, total_ram_gb
+)
 
 # Configuration
 APP_NAME = "SuperPalmTree"
@@ -27,24 +31,68 @@ OLLAMA_PORT = 11434
 # Paths to bundled binaries (relative to the app bundle)
 BUNDLE_DIR = Path(__file__).parent.parent / "embedded"
 
+# Web UI assets; files up to STATIC_CACHE_MAX_BYTES are served from memory
+STATIC_DIR = Path(__file__).parent.parent / "static"
+STATIC_CACHE_MAX_BYTES = 256 * 1024
+
 # Bundled model path (embed in the executable)
 BUNDLED_MODEL = BUNDLE_DIR / "models" / "qwen3-1.7b.gguf"
 
+# Model download: 4 MiB reads, console progress at most 10 times a second
+DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+PROGRESS_INTERVAL_S = 0.1
+
+
+class _ProgressWriter:
+    """File wrapper that counts and hashes bytes written, reporting them at a throttled rate"""
+
+    def __init__(self, out_file, report, interval: float = PROGRESS_INTERVAL_S):
+        self._out = out_file
+        self._report = report
+        self._interval = interval
+        self._last_emit = time.monotonic()
+        self.written = 0
+        self.sha256 = hashlib.sha256()
 
-def get_platform() -> str:
-    """Get current platform"""
-    if sys.platform.startswith("linux"):
-        return "linux"
-    elif sys.platform == "darwin":
-        return "macos"
-    elif sys.platform == "win32":
-        return "windows"
-    return "linux"
+    def write(self, data) -> int:
+        n = self._out.write(data)
+        self.written += len(data)
+        self.sha256.update(data)
+        now = time.monotonic()
+        if now - self._last_emit >= self._interval:
+            self._last_emit = now
+            self._report(self.written)
+        return n
+
+
+def _published_sha256(url: str) -> Optional[str]:
+    """
+    SHA-256 Hugging Face publishes for an LFS file, or None if unavailable.
+    
+    A resolve/ URL answers with a redirect whose X-Linked-Etag header is the
+    file's sha256, so it is read without following the redirect.
+    """
+    try:
+        response = HTTP.head(url, allow_redirects=False, timeout=(5, 30))
+    except Exception:
+        return None
+    etag = response.headers.get("X-Linked-Etag") or response.headers.get("ETag") or ""
+    etag = etag.removeprefix("W/").strip('"').lower()
+    if len(etag) == 64 and all(c in "0123456789abcdef" for c in etag):
+        return etag
+    return None
+
+
+def _write_atomic(path: Path, text: str):
+    """Write text to path via a temp file + os.replace, so readers never see a partial file"""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
 
 
 def detect_hardware() -> Dict[str, Any]:
     """Detect RAM and set appropriate model"""
-    ram_gb = psutil.virtual_memory().total / (1024**3)
+    ram_gb = total_ram_gb()
     
     # Use 1.7b model for 4GB+ RAM (what we bundle)
     # For systems with more RAM, this still works well
@@ -64,8 +112,13 @@ def detect_hardware() -> Dict[str, Any]:
 class OllamaManager:
     """Manages bundled Ollama instance - fully self-contained"""
     
+    # Fields reported by /api/status; assigning any of them drops the cached payload
+    STATUS_FIELDS = frozenset({"model_name", "model_ready", "phase", "status_message", "progress"})
+    
     def __init__(self):
-        self.process = None
+        self._status_lock = threading.Lock()
+        self._status_cache: Optional[bytes] = None
+        self.service = OllamaService(OLLAMA_PORT, models_dir=CONFIG_DIR / "models")
         self.platform = get_platform()
         self.model_name = None
         self.context_size = None
@@ -78,6 +131,25 @@ class OllamaManager:
         SANDBOX_DIR.mkdir(exist_ok=True)
         CONFIG_DIR.mkdir(exist_ok=True)
     
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in self.STATUS_FIELDS:
+            with self._status_lock:
+                super().__setattr__("_status_cache", None)
+    
+    def status_payload(self) -> bytes:
+        """JSON status for the Web UI, re-encoded only after a status field changes"""
+        with self._status_lock:
+            if self._status_cache is None:
+                self._status_cache = json_dumpb({
+                    "ready": self.model_ready,
+                    "model": self.model_name,
+                    "phase": self.phase,
+                    "status_message": self.status_message,
+                    "progress": self.progress,
+                })
+            return self._status_cache
+    
     def get_ollama_binary(self) -> Optional[Path]:
         """Get bundled Ollama binary path"""
         platform_paths = {
@@ -100,13 +172,8 @@ class OllamaManager:
         return None
     
     def is_running(self) -> bool:
-        """Check if Ollama is responding"""
-        try:
-            import urllib.request
-            urllib.request.urlopen(f"http://127.0.0.1:{OLLAMA_PORT}/api/tags", timeout=2)
-            return True
-        except:
-            return False
+        """Check if Ollama is accepting connections"""
+        return self.service.is_listening()
     
     def start(self) -> bool:
         """Start bundled Ollama - no external dependencies"""
@@ -128,31 +195,18 @@ class OllamaManager:
         
         print(f"Starting bundled Ollama from: {ollama_path}")
         
-        env = os.environ.copy()
-        env["OLLAMA_HOST"] = f"127.0.0.1:{OLLAMA_PORT}"
-        env["OLLAMA_MODELS"] = str(CONFIG_DIR / "models")
+        self.phase = "starting_ollama"
+        self.status_message = "Starting embedded Ollama server..."
+        self.progress = 10
         
         try:
-            self.process = subprocess.Popen(
-                [str(ollama_path), "serve"],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                env=env
-            )
-            
-            self.phase = "starting_ollama"
-            self.status_message = "Starting embedded Ollama server..."
-            self.progress = 10
-
-            # Wait for Ollama to be ready
-            for i in range(30):
-                time.sleep(1)
-                if self.is_running():
-                    print("Ollama ready")
-                    self.phase = "ollama_ready"
-                    self.status_message = "Ollama server is running"
-                    self.progress = 30
-                    return True
+            # Launch and wait for Ollama to be ready
+            if self.service.start(ollama_path):
+                print("Ollama ready")
+                self.phase = "ollama_ready"
+                self.status_message = "Ollama server is running"
+                self.progress = 30
+                return True
             
             print("Ollama failed to start")
             self.phase = "error"
@@ -171,8 +225,6 @@ class OllamaManager:
         Best-effort fallback: download the model if it was not bundled.
         This is only used when the embedded GGUF is missing (e.g. dev builds).
         """
-        import urllib.request
-
         BUNDLED_MODEL.parent.mkdir(parents=True, exist_ok=True)
 
         url = (
@@ -185,41 +237,95 @@ class OllamaManager:
         self.status_message = "Downloading model (first run on this machine)..."
         self.progress = 35
 
-        try:
-            with urllib.request.urlopen(url, timeout=600) as response, open(
-                BUNDLED_MODEL, "wb"
-            ) as out_file:
-                total = int(response.headers.get("Content-Length", "0") or "0")
-                downloaded = 0
-                chunk_size = 1024 * 1024
-
-                while True:
-                    chunk = response.read(chunk_size)
-                    if not chunk:
-                        break
-                    out_file.write(chunk)
-                    downloaded += len(chunk)
-                    if total:
-                        percent = int(downloaded * 100 / total)
-                        # Console-only progress; UI polls status_message
-                        print(f"\rDownloading model... {percent}% ", end="", flush=True)
-                        self.progress = max(35, min(90, percent))
-
-            print("\nModel download complete")
-            self.status_message = "Model downloaded. Preparing model..."
-            self.progress = 90
-            return True
-        except Exception as e:
-            print(f"\nFailed to download model: {e}")
-            self.phase = "error"
-            self.status_message = (
-                "Failed to download model. Please check your network or reinstall."
-            )
-            self.progress = 0
-            return False
+        # A truncated or corrupt file is retried once instead of
+        # surfacing later as a failed (and slow) `ollama create`
+        for attempt in range(2):
+            try:
+                problem = self._fetch_model(url)
+            except Exception as e:
+                problem = str(e)
+            if problem is None:
+                print("\nModel download complete")
+                self.status_message = "Model downloaded. Preparing model..."
+                self.progress = 90
+                return True
+
+            BUNDLED_MODEL.unlink(missing_ok=True)
+            if attempt == 0:
+                print(f"\nModel download failed ({problem}), retrying...")
+
+        print(f"\nFailed to download model: {problem}")
+        self.phase = "error"
+        self.status_message = (
+            "Failed to download model. Please check your network or reinstall."
+        )
+        self.progress = 0
+        return False
+
+    def _fetch_model(self, url: str) -> Optional[str]:
+        """Stream url to BUNDLED_MODEL; returns None if intact, else what was wrong"""
+        import urllib.request
+
+        expected = _published_sha256(url)
+        if expected is None:
+            print("No published SHA-256 for the model; checking its length only")
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+        with urllib.request.urlopen(url, timeout=600) as response, os.fdopen(
+            os.open(BUNDLED_MODEL, flags, 0o644), "wb"
+        ) as out_file:
+            fd = out_file.fileno()
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            total = int(response.headers.get("Content-Length", "0") or "0")
+
+            def report(downloaded: int):
+                if total:
+                    percent = int(downloaded * 100 / total)
+                    # Console-only progress; UI polls status_message
+                    print(f"\rDownloading model... {percent}% ", end="", flush=True)
+                    self.progress = max(35, min(90, percent))
+
+            writer = _ProgressWriter(out_file, report)
+            shutil.copyfileobj(response, writer, DOWNLOAD_CHUNK_SIZE)
+            report(writer.written)
+
+            # Flush to disk and drop the written pages from the page cache:
+            # Ollama maps the file itself, so keeping our copy only evicts
+            # other processes' working sets
+            out_file.flush()
+            os.fsync(fd)
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+        if total and writer.written != total:
+            return f"truncated: got {writer.written} of {total} bytes"
+        if expected and writer.sha256.hexdigest() != expected:
+            return f"SHA-256 mismatch: got {writer.sha256.hexdigest()}, expected {expected}"
+        return None
 
     def ensure_model(self) -> bool:
         """Load bundled model; download once if it was not bundled."""
+        # Modelfile for the embedded model
+        modelfile_content = f"""FROM {BUNDLED_MODEL}
+PARAMETER num_ctx {self.context_size}
+PARAMETER temperature 0.7
+"""
+        
+        modelfile_path = CONFIG_DIR / "Modelfile"
+        hash_path = CONFIG_DIR / ".modelfile.hash"
+        want = hashlib.blake2b(modelfile_content.encode(), digest_size=16).hexdigest()
+        try:
+            have = hash_path.read_text().strip()
+        except OSError:
+            have = None
+        
+        # Already imported from this exact Modelfile: one /api/tags call and
+        # we're done, without touching (or downloading) the GGUF
+        if have == want and self.service.has_model(self.model_name):
+            print(f"Model {self.model_name} unchanged, skipping create")
+            self._set_model_ready()
+            return True
+        
         if not BUNDLED_MODEL.exists():
             print(f"Bundled model not found at {BUNDLED_MODEL}")
             # Best effort: download the model so a fresh system still works
@@ -233,14 +339,7 @@ class OllamaManager:
         if self.progress < 40:
             self.progress = 40
         
-        # Create Modelfile for the embedded model
-        modelfile_content = f"""FROM {BUNDLED_MODEL}
-PARAMETER num_ctx {self.context_size}
-PARAMETER temperature 0.7
-"""
-        
-        modelfile_path = CONFIG_DIR / "Modelfile"
-        modelfile_path.write_text(modelfile_content)
+        _write_atomic(modelfile_path, modelfile_content)
         
         # Create model from file
         ollama_path = self.get_ollama_binary()
@@ -257,11 +356,8 @@ PARAMETER temperature 0.7
         )
         
         if result.returncode == 0:
-            print(f"Model {self.model_name} ready")
-            self.model_ready = True
-            self.phase = "ready"
-            self.status_message = "Model ready. You can start chatting."
-            self.progress = 100
+            _write_atomic(hash_path, want)
+            self._set_model_ready()
             return True
         else:
             print(f"Model creation failed: {result.stderr}")
@@ -270,41 +366,55 @@ PARAMETER temperature 0.7
             self.progress = 0
             return False
     
+    def _set_model_ready(self):
+        print(f"Model {self.model_name} ready")
+        self.model_ready = True
+        self.phase = "ready"
+        self.status_message = "Model ready. You can start chatting."
+        self.progress = 100
+    
+    def chat_stream(self, message: str) -> Iterator[str]:
+        """Send message to LLM and yield the response as it is generated"""
+        payload = {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": message}],
+            "stream": True,
+            "options": {
+                "num_ctx": self.context_size
+            }
+        }
+        
+        # Ollama streams one JSON object per line (NDJSON)
+        with HTTP.post(
+            f"{self.service.base_url}/api/chat",
+            data=json_dumpb(payload),
+            headers={"Content-Type": "application/json"},
+            timeout=OLLAMA_TIMEOUT,
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                data = json_loads(line)
+                if data.get("error"):
+                    raise RuntimeError(data["error"])
+                content = data.get("message", {}).get("content")
+                if content:
+                    yield content
+                if data.get("done"):
+                    break
+    
     def chat(self, message: str) -> str:
         """Send message to LLM and get response"""
         try:
-            import urllib.request
-            
-            payload = {
-                "model": self.model_name,
-                "messages": [{"role": "user", "content": message}],
-                "stream": False,
-                "options": {
-                    "num_ctx": self.context_size
-                }
-            }
-            
-            req = urllib.request.Request(
-                f"http://127.0.0.1:{OLLAMA_PORT}/api/chat",
-                data=json.dumps(payload).encode(),
-                headers={"Content-Type": "application/json"}
-            )
-            
-            with urllib.request.urlopen(req, timeout=120) as response:
-                data = json.loads(response.read().decode())
-                return data.get("message", {}).get("content", "No response")
-                
+            return "".join(self.chat_stream(message)) or "No response"
         except Exception as e:
             return f"Error: {e}"
     
     def stop(self):
         """Stop Ollama"""
-        if self.process:
-            self.process.terminate()
-            try:
-                self.process.wait(timeout=5)
-            except:
-                self.process.kill()
+        self.service.stop()
 
 
 class WebUI:
@@ -313,80 +423,166 @@ class WebUI:
     def __init__(self, ollama: OllamaManager, port: int = 8080):
         self.ollama = ollama
         self.port = port
-        self.static_dir = Path(__file__).parent.parent / "static"
+        self.static_dir = STATIC_DIR
     
     def start(self):
         """Start web server in background thread"""
-        handler = self.create_handler()
-        server = socketserver.TCPServer(("", self.port), handler)
-        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        # One thread per connection so /api/status polls are answered while
+        # a chat request is generating (HTTPServer already sets SO_REUSEADDR)
+        server = http.server.ThreadingHTTPServer(("", self.port), APIHandler)
+        server.daemon_threads = True
+        
+        def serve():
+            self._yield_cpu_to_ollama()
+            server.serve_forever()
+        
+        thread = threading.Thread(target=serve, daemon=True)
         thread.start()
         print(f"Web UI: http://localhost:{self.port}")
         return server
+    
+    @staticmethod
+    def _yield_cpu_to_ollama():
+        """Keep the calling UI thread on CPU 0 at lower priority so inference keeps the other cores"""
+        # On Linux both settings are per-thread and inherited by the request
+        # threads this one spawns; the main thread is left alone
+        if hasattr(os, "sched_setaffinity") and (os.cpu_count() or 1) > 1:
+            try:
+                os.sched_setaffinity(0, {0})
+            except OSError:
+                pass
+        if hasattr(os, "nice"):
+            try:
+                os.nice(5)
+            except OSError:
+                pass
 
 
 class APIHandler(http.server.SimpleHTTPRequestHandler):
     """Handle API requests for the AI agent"""
     
+    # Keep-alive for the UI's status polls; every response carries a Content-Length
+    protocol_version = "HTTP/1.1"
+    # Buffer writes so the status line, headers and body leave in one send
+    wbufsize = -1
+    
+    # URL path -> (body, ETag, Content-Type) for small UI assets
+    _static_cache: Dict[str, Tuple[bytes, str, str]] = {}
+    
     def __init__(self, *args, **kwargs):
-        super().__init__(*args, directory=str(Path(__file__).parent.parent / "static"), **kwargs)
+        super().__init__(*args, directory=str(STATIC_DIR), **kwargs)
     
     def do_POST(self):
         """Handle POST requests"""
         if self.path == "/api/chat":
             self.handle_chat()
         else:
+            # The request body was never read, so this connection can't be reused
+            self.close_connection = True
             self.send_error(404)
     
     def do_GET(self):
         """Handle GET requests"""
         if self.path == "/api/status":
             self.handle_status()
-        else:
+        elif not self.serve_cached_static():
             super().do_GET()
     
     def handle_chat(self):
-        """Handle chat API request"""
+        """Handle chat API request, streaming tokens back as Server-Sent Events"""
         try:
             content_length = int(self.headers["Content-Length"])
             post_data = self.rfile.read(content_length)
-            data = json.loads(post_data.decode())
-            
+            data = json_loads(post_data)
             message = data.get("message", "")
-            
-            # Get Ollama instance from global
-            ollama = getattr(APIHandler, 'ollama', None)
-            if ollama and ollama.model_ready:
-                response = ollama.chat(message)
-            else:
-                response = "Error: Model not ready"
-            
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps({"response": response}).encode())
-            
         except Exception as e:
-            self.send_response(500)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps({"error": str(e)}).encode())
+            self.send_json(500, json_dumpb({"error": str(e)}))
+            return
+        
+        # The stream has no Content-Length, so it ends with the connection
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        
+        # Get Ollama instance from global
+        ollama = getattr(APIHandler, 'ollama', None)
+        try:
+            if not (ollama and ollama.model_ready):
+                raise RuntimeError("Model not ready")
+            for token in ollama.chat_stream(message):
+                self.send_event({"token": token})
+            self.send_event({"done": True})
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Browser went away mid-answer
+        except Exception as e:
+            self.send_event({"error": str(e)})
+    
+    def send_event(self, payload: Dict[str, Any]):
+        """Write one SSE event and push it to the browser immediately"""
+        self.wfile.write(b"data: " + json_dumpb(payload) + b"\n\n")
+        self.wfile.flush()
     
     def handle_status(self):
         """Return system status"""
         ollama = getattr(APIHandler, 'ollama', None)
-        status = {
-            "ready": ollama.model_ready if ollama else False,
-            "model": ollama.model_name if ollama else None,
-            "phase": getattr(ollama, "phase", None) if ollama else None,
-            "status_message": getattr(ollama, "status_message", "Starting...") if ollama else "Starting...",
-            "progress": getattr(ollama, "progress", 0) if ollama else 0,
-        }
+        if ollama:
+            body = ollama.status_payload()
+        else:
+            body = json_dumpb({
+                "ready": False,
+                "model": None,
+                "phase": None,
+                "status_message": "Starting...",
+                "progress": 0,
+            })
+        
+        self.send_json(200, body, {"Cache-Control": "no-store"})
+    
+    def serve_cached_static(self) -> bool:
+        """Serve a small UI asset from memory with an ETag; False if not cacheable"""
+        path = urlsplit(self.path).path
+        if path == "/":
+            path = "/index.html"
+        
+        entry = self._static_cache.get(path)
+        if entry is None:
+            file = (STATIC_DIR / path.lstrip("/")).resolve()
+            if (file.parent != STATIC_DIR.resolve() or not file.is_file()
+                    or file.stat().st_size > STATIC_CACHE_MAX_BYTES):
+                return False
+            data = file.read_bytes()
+            etag = '"%s"' % hashlib.blake2b(data, digest_size=8).hexdigest()
+            entry = (data, etag, self.guess_type(str(file)))
+            self._static_cache[path] = entry
+        
+        data, etag, content_type = entry
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return True
         
         self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(data)
+        return True
+    
+    def send_json(self, code: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+        """Send an encoded JSON body with its Content-Length"""
+        self.send_response(code)
         self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
-        self.wfile.write(json.dumps(status).encode())
+        self.wfile.write(body)
     
     def log_message(self, format, *args):
         """Suppress logging"""
@@ -433,14 +629,20 @@ def main():
     print("  Ready! Open: http://localhost:8080")
     print(f"{'='*50}\n")
     
-    # Keep running
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        print("\nShutting down...")
-        ollama.stop()
-        server.shutdown()
+    # Sleep until Ctrl+C or a termination request - no periodic wakeups
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    if sys.platform == "win32":
+        # An untimed wait can't be interrupted by Ctrl+C on Windows
+        while not stop.wait(1):
+            pass
+    else:
+        stop.wait()
+    
+    print("\nShutting down...")
+    ollama.stop()
+    server.shutdown()
 
 
 if __name__ == "__main__":
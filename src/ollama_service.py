@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Shared Ollama server management - start, health probe and stop in one place"""
+
+import os
+import sys
+import json
+import time
+import socket
+import select
+import subprocess
+import functools
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumpb = orjson.dumps
+
+    def json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:  # Fall back to the stdlib codec
+    json_loads = json.loads
+    json_dumps = json.dumps
+
+    def json_dumpb(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+
+# (connect, read) for model calls: fail fast if the server is down, wait out long generations
+OLLAMA_TIMEOUT = (1, 300)
+
+# Keep-alive connection pool shared by every OllamaService and model call;
+# sized for agent.py's parallel steps plus an embed/keep-alive request
+HTTP = requests.Session()
+HTTP.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0))
+
+
+def get_platform() -> str:
+    """Get current platform"""
+    if sys.platform.startswith("linux"):
+        return "linux"
+    elif sys.platform == "darwin":
+        return "macos"
+    elif sys.platform == "win32":
+        return "windows"
+    return "linux"
+
+
+@functools.lru_cache(maxsize=1)
+def total_ram_gb() -> float:
+    """Physical RAM in GiB - fixed for the life of the process, so read /proc/meminfo once"""
+    import psutil
+    return psutil.virtual_memory().total / (1024**3)
+
+
+def wait_ready(probe: Callable[[], bool], deadline_s: float = 60,
+               initial_delay: float = 0.05, max_delay: float = 1.0) -> bool:
+    """Poll probe() with exponential backoff (doubling up to max_delay) until it passes or time runs out"""
+    delay = initial_delay
+    end = time.monotonic() + deadline_s
+    while time.monotonic() < end:
+        if probe():
+            return True
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+    return False
+
+
+class OllamaService:
+    """An `ollama serve` process bound to 127.0.0.1:<port>, started on demand"""
+
+    def __init__(self, port: int, models_dir: Optional[Path] = None):
+        self.port = port
+        self.models_dir = models_dir
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.process: Optional[subprocess.Popen] = None
+        # Linux 5.3+: a pidfd becomes readable when the process exits
+        self._pidfd: Optional[int] = None
+
+    def is_listening(self, timeout: float = 0.2) -> bool:
+        """Check whether the port accepts TCP connections - a cheap liveness probe"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            return sock.connect_ex(("127.0.0.1", self.port)) == 0
+        finally:
+            sock.close()
+
+    def is_running(self) -> bool:
+        """Check if the Ollama API is responding"""
+        try:
+            return HTTP.get(f"{self.base_url}/api/tags", timeout=(0.2, 0.5)).ok
+        except requests.RequestException:
+            return False
+
+    def has_model(self, name: str) -> bool:
+        """Check whether the server already has the named model"""
+        if ":" not in name:
+            name += ":latest"
+        try:
+            response = HTTP.get(f"{self.base_url}/api/tags", timeout=(0.2, 5))
+            return response.ok and any(
+                m.get("name") == name for m in response.json().get("models", [])
+            )
+        except (requests.RequestException, ValueError):
+            return False
+
+    def start(self, binary: Union[str, Path] = "ollama",
+              extra_env: Optional[Dict[str, str]] = None,
+              deadline_s: float = 60, initial_delay: float = 0.05,
+              max_delay: float = 1.0, **popen_kwargs) -> bool:
+        """Launch `ollama serve` and wait until it answers (backoff as in wait_ready)"""
+        env = os.environ.copy()
+        env["OLLAMA_HOST"] = f"127.0.0.1:{self.port}"
+        if self.models_dir:
+            env["OLLAMA_MODELS"] = str(self.models_dir)
+        env.update(extra_env or {})
+
+        self.process = subprocess.Popen(
+            [str(binary), "serve"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **popen_kwargs
+        )
+        if hasattr(os, "pidfd_open"):
+            try:
+                self._pidfd = os.pidfd_open(self.process.pid)
+            except OSError:
+                self._pidfd = None
+        # Poll the bare port while starting up, then confirm with a single
+        # API round-trip that it is Ollama answering
+        return (wait_ready(self.is_listening, deadline_s, initial_delay, max_delay)
+                and self.is_running())
+
+    def stop(self, timeout: float = 5):
+        """Terminate the server we started, killing it if it doesn't exit in time"""
+        if not self.process:
+            return
+        self.process.terminate()
+        if self._pidfd is not None:
+            # One blocking wait in the kernel instead of waitpid() polling
+            exited, _, _ = select.select([self._pidfd], [], [], timeout)
+            if not exited:
+                self.process.kill()
+            self.process.wait()
+            os.close(self._pidfd)
+            self._pidfd = None
+        else:
+            try:
+                self.process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
 """Isolated runtime - Ollama on 11435, Chromium on 9223"""
 
-import os
-import subprocess
-import time
+import threading
 from pathlib import Path
 
+from ollama_service import OllamaService
+
 DATA_DIR = Path.home() / ".superpalmtree"
 OLLAMA_PORT = 11435
 CHROME_PORT = 9223
@@ -13,55 +13,30 @@ CHROME_PORT = 9223
 
 class Runtime:
     def __init__(self):
-        self.ollama_proc = None
         DATA_DIR.mkdir(parents=True, exist_ok=True)
         (DATA_DIR / "models").mkdir(exist_ok=True)
         (DATA_DIR / "workspace").mkdir(exist_ok=True)
+        self.ollama = OllamaService(OLLAMA_PORT, models_dir=DATA_DIR / "models")
 
     def start_ollama(self) -> bool:
         """Start isolated Ollama on port 11435"""
-        env = os.environ.copy()
-        env["OLLAMA_HOST"] = f"127.0.0.1:{OLLAMA_PORT}"
-        env["OLLAMA_MODELS"] = str(DATA_DIR / "models")
-
-        # Check if already running
-        try:
-            import requests
-            r = requests.get(f"http://127.0.0.1:{OLLAMA_PORT}/api/tags", timeout=2)
-            if r.ok:
-                return True
-        except:
-            pass
-
-        # Start Ollama
-        self.ollama_proc = subprocess.Popen(
-            ["ollama", "serve"],
-            env=env,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
-
-        # Wait for ready
-        for _ in range(30):
-            try:
-                import requests
-                if requests.get(f"http://127.0.0.1:{OLLAMA_PORT}/api/tags", timeout=1).ok:
-                    return True
-            except:
-                pass
-            time.sleep(1)
-        return False
+        if self.ollama.is_listening():
+            return True
+        return self.ollama.start()
 
     def stop(self):
-        if self.ollama_proc:
-            self.ollama_proc.terminate()
+        self.ollama.stop()
 
 
 # Singleton
 _runtime = None
+_runtime_lock = threading.Lock()
 
 def get_runtime() -> Runtime:
     global _runtime
-    if not _runtime:
-        _runtime = Runtime()
+    # Double-checked: no lock on the hot path, one Runtime even if threads race here
+    if _runtime is None:
+        with _runtime_lock:
+            if _runtime is None:
+                _runtime = Runtime()
     return _runtime
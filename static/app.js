@@ -33,6 +33,25 @@ function appendMessage(role, text) {
   messagesEl.appendChild(wrapper);
 
   chatArea.scrollTop = chatArea.scrollHeight;
+  return bubble;
+}
+
+// Read the Server-Sent Events stream from /api/chat, calling onEvent per event
+async function readEvents(res, onEvent) {
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let end;
+    while ((end = buffer.indexOf("\n\n")) !== -1) {
+      const event = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+      if (event.startsWith("data: ")) onEvent(JSON.parse(event.slice(6)));
+    }
+  }
 }
 
 async function pollStatus() {
@@ -89,11 +108,35 @@ async function sendMessage() {
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ message: text }),
     });
-    const data = await res.json();
-    messagesEl.removeChild(typing);
-    appendMessage("assistant", data.response || data.error || "No response");
+    if (!(res.headers.get("Content-Type") || "").startsWith("text/event-stream")) {
+      const data = await res.json();
+      messagesEl.removeChild(typing);
+      appendMessage("assistant", data.response || data.error || "No response");
+      return;
+    }
+
+    // Swap the typing indicator for a bubble on the first token, then grow it
+    let bubble = null;
+    let text = "";
+    const show = (content) => {
+      if (!bubble) {
+        messagesEl.removeChild(typing);
+        bubble = appendMessage("assistant", "");
+      }
+      bubble.textContent = content;
+      chatArea.scrollTop = chatArea.scrollHeight;
+    };
+    await readEvents(res, (event) => {
+      if (event.token) {
+        text += event.token;
+        show(text);
+      } else if (event.error) {
+        show(text ? `${text}\n\nError: ${event.error}` : `Error: ${event.error}`);
+      }
+    });
+    if (!bubble) show("No response");
   } catch (e) {
-    messagesEl.removeChild(typing);
+    if (typing.parentNode) messagesEl.removeChild(typing);
     appendMessage("assistant", "Error contacting backend.");
   } finally {
     sendBtn.disabled = !inputField.value.trim();
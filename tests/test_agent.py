@@ -0,0 +1,150 @@
+"""Tests for the planner's JSON parsing, response cache and step batching"""
+
+import json
+
+import pytest
+
+import agent
+from agent import (
+    OLLAMA_NUM_PARALLEL,
+    ResponseCache,
+    SuperPalmTree,
+    TaskStep,
+    _extract_json,
+    _json_body_start,
+    _JsonObjectTracker,
+    _JsonStreamStop,
+)
+
+PLAN = '{"task_summary": "t", "steps": [{"step_num": 1}]}'
+
+
+def feed_chunks(chunks):
+    """Stream chunks through _JsonStreamStop; return the text read before it stopped"""
+    stopper = _JsonStreamStop()
+    seen = []
+    for chunk in chunks:
+        seen.append(chunk)
+        if stopper.feed(chunk):
+            break
+    return "".join(seen)
+
+
+# --- JSON early stop and extraction ---
+
+def test_think_block_braces_are_not_the_answer():
+    text = "<think>maybe {\"a\": 1} or {}</think>\n```json\n" + PLAN + "\n```"
+    assert _json_body_start("<think>maybe {\"a\": 1}") == -1
+    assert json.loads(_extract_json(text))["task_summary"] == "t"
+
+
+def test_stream_waits_for_the_closing_think_tag():
+    chunks = ["<think>{\"x\": ", "1}</think>", PLAN, " trailing"]
+    assert feed_chunks(chunks) == "<think>{\"x\": 1}</think>" + PLAN
+
+
+def test_json_fence_split_across_chunks():
+    chunks = ["Here is the plan:\n``", "`js", "on\n{\"task_summary\": ", "\"t\", \"steps\": []}", "\n```\nDone."]
+    seen = feed_chunks(chunks)
+    assert seen.endswith("\"steps\": []}")
+    assert json.loads(_extract_json(seen)) == {"task_summary": "t", "steps": []}
+
+
+def test_prose_then_bare_object():
+    text = "Sure, here you go: " + PLAN + " Let me know!"
+    assert _json_body_start(text) == -1  # No fence and no leading brace: not streamed-stopped
+    assert _extract_json(text) == PLAN
+
+
+def test_leading_bare_object_stops_the_stream():
+    assert feed_chunks(["  ", PLAN[:10], PLAN[10:], " extra"]) == "  " + PLAN
+
+
+def test_braces_inside_strings():
+    text = '{"cmd": "echo \\"}{\\" {", "n": {"k": "}"}} tail'
+    end = _JsonObjectTracker().feed(text)
+    assert json.loads(text[:end + 1]) == {"cmd": 'echo "}{" {', "n": {"k": "}"}}
+    assert _extract_json(text) == text[:end + 1]
+
+
+def test_unterminated_object_is_returned_whole():
+    assert _extract_json('{"a": {') == '{"a": {'
+    assert _extract_json("no json here") == "no json here"
+
+
+# --- ResponseCache ---
+
+@pytest.fixture
+def cache(tmp_path):
+    c = ResponseCache(tmp_path / "cache.db", max_rows=3)
+    yield c
+    c.close()
+
+
+def test_cache_trims_oldest_rows(cache):
+    for i in range(5):
+        cache.put("m", "s", f"prompt {i}", f"response {i}")
+    assert cache.get("m", "s", "prompt 0") is None
+    assert cache.get("m", "s", "prompt 1") is None
+    assert [cache.get("m", "s", f"prompt {i}") for i in (2, 3, 4)] == [
+        "response 2", "response 3", "response 4"
+    ]
+
+
+def test_cache_rewrite_counts_as_newest(cache):
+    for i in range(3):
+        cache.put("m", "s", f"prompt {i}", f"response {i}")
+    cache.put("m", "s", "prompt 0", "response 0")
+    cache.put("m", "s", "prompt 3", "response 3")
+    assert cache.get("m", "s", "prompt 0") == "response 0"
+    assert cache.get("m", "s", "prompt 1") is None
+
+
+def test_cache_discard_is_scoped(cache):
+    cache.put("m", "s", "a", "bad")
+    cache.put("m", "s", "b", "bad")
+    cache.put("other", "s", "a", "bad")
+    cache.discard("m", "s", "bad")
+    assert cache.get("m", "s", "a") is None
+    assert cache.get("m", "s", "b") is None
+    assert cache.get("other", "s", "a") == "bad"
+
+
+def test_semantic_hit_needs_matching_literals(cache):
+    cache.put("m", "s", "read ~/superpalmtree-exp/a.txt", "plan a", [1.0, 0.0])
+    assert cache.get_similar("m", "s", "please read ~/superpalmtree-exp/a.txt", [1.0, 0.01]) == "plan a"
+    assert cache.get_similar("m", "s", "read ~/superpalmtree-exp/b.txt", [1.0, 0.01]) is None
+    assert cache.get_similar("m", "s", "please read ~/superpalmtree-exp/a.txt", [0.0, 1.0]) is None
+
+
+# --- Step batching ---
+
+def step(num, tool="shell", **params):
+    return TaskStep(step_num=num, tool=tool, params=params, purpose="", estimated_seconds=1)
+
+
+def batch_nums(steps):
+    # _batch_steps reads no instance state; skip __init__ and its Ollama/cache setup
+    tree = SuperPalmTree.__new__(SuperPalmTree)
+    return [[s.step_num for s in batch] for batch in tree._batch_steps(steps)]
+
+
+def test_independent_steps_share_a_batch():
+    steps = [step(i, command=f"echo {i}") for i in range(1, OLLAMA_NUM_PARALLEL + 2)]
+    nums = batch_nums(steps)
+    assert nums[0] == list(range(1, OLLAMA_NUM_PARALLEL + 1))
+    assert nums[1] == [OLLAMA_NUM_PARALLEL + 1]
+
+
+@pytest.mark.parametrize("ref", ["{{step 1}}", "output of step_1", "the previous result"])
+def test_step_reference_starts_a_new_batch(ref):
+    assert batch_nums([step(1, command="ls"), step(2, command=f"cat {ref}")]) == [[1], [2]]
+
+
+def test_browser_steps_run_alone():
+    steps = [step(1, "browser_navigate", url="x"), step(2, command="ls"), step(3, command="pwd")]
+    assert batch_nums(steps) == [[1], [2, 3]]
+
+
+def test_step_numbers_are_not_references():
+    assert agent.STEP_REFERENCE.search(json.dumps({"command": "head -n 2 file"})) is None